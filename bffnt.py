@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import functools
+import itertools
 import json
-import math
+import mmap
 import os.path
+import re
 import struct
 import sys
 from enum import Enum
-from typing import Callable, List, Optional, Tuple, assert_never
+from typing import Optional, assert_never
 
+import numpy
 import png
 import typer
 from typer import Option as Opt
 
+try:
+    # noinspection PyUnresolvedReferences
+    import orjson
+except ImportError:
+    pass
+
 # FINF = Font Info
 # TGLP = Texture Glyph
 # CWDH = Character Widths
@@ -37,6 +47,20 @@ TGLP_HEADER_STRUCT = '%s4sI4BI6HI'
 CWDH_HEADER_STRUCT = '%s4sI2HI'
 CMAP_HEADER_STRUCT = '%s4sI4HI'
 
+# precompiled structs for both byte orders
+STRUCTS = {
+    order: {
+        'ffnt': struct.Struct(FFNT_HEADER_STRUCT % order),
+        'finf': struct.Struct(FINF_HEADER_STRUCT % order),
+        'tglp': struct.Struct(TGLP_HEADER_STRUCT % order),
+        'cwdh': struct.Struct(CWDH_HEADER_STRUCT % order),
+        'cmap': struct.Struct(CMAP_HEADER_STRUCT % order),
+        'u16': struct.Struct('%sH' % order),
+        'u32': struct.Struct('%sI' % order),
+    }
+    for order in '<>'
+}
+
 class Format(Enum):
     RGBA8 = 0x00
     RGB8 = 0x01
@@ -55,21 +79,25 @@ class Format(Enum):
     ETC1A4 = 0x0D
 
     def format_size(self) -> int:
-        match self:
-            case Format.RGBA8: return 32
-            case Format.RGB8: return 24
-            case Format.RGBA5551: return 16
-            case Format.RGB565: return 16
-            case Format.RGBA4: return 16
-            case Format.LA8: return 16
-            case Format.HILO8: return 16
-            case Format.L8: return 8
-            case Format.A8: return 8
-            case Format.LA4: return 8
-            case Format.L4: return 4
-            case Format.A4: return 4
-            case Format.ETC1: return 64
-            case Format.ETC1A4: return 128
+        return FORMAT_SIZES[self]
+
+# bits per pixel (or per 4x4 block for ETC1/ETC1A4)
+FORMAT_SIZES = {
+    Format.RGBA8: 32,
+    Format.RGB8: 24,
+    Format.RGBA5551: 16,
+    Format.RGB565: 16,
+    Format.RGBA4: 16,
+    Format.LA8: 16,
+    Format.HILO8: 16,
+    Format.L8: 8,
+    Format.A8: 8,
+    Format.LA4: 8,
+    Format.L4: 4,
+    Format.A4: 4,
+    Format.ETC1: 64,
+    Format.ETC1A4: 128,
+}
 
 ETC_INDIV_RED1_OFFSET = 60
 ETC_INDIV_GREEN1_OFFSET = 52
@@ -89,7 +117,7 @@ ETC_TABLE2_OFFSET = 34
 ETC_DIFFERENTIAL_BIT = 33
 ETC_ORIENTATION_BIT = 32
 
-ETC_MODIFIERS = [
+ETC_MODIFIERS = numpy.array([
     [2, 8],
     [5, 17],
     [9, 29],
@@ -98,7 +126,28 @@ ETC_MODIFIERS = [
     [24, 80],
     [33, 106],
     [47, 183]
-]
+], dtype=numpy.int16)
+
+# shift of the even and the odd pixel within a byte of a 4 bit format
+NIBBLE_SHIFTS = numpy.array([0, 4], dtype=numpy.uint8)
+
+# position of every pixel of an 8x8 tile, in storage order. a tile is composed of
+# 2x2 sub-tiles, sub-tile is composed of 2x2 pixel groups, pixel group is composed of 2x2 pixels
+_SWIZZLE_INDEX = numpy.arange(64)
+SWIZZLE_X = (_SWIZZLE_INDEX & 1) | ((_SWIZZLE_INDEX >> 1) & 2) | ((_SWIZZLE_INDEX >> 2) & 4)
+SWIZZLE_Y = ((_SWIZZLE_INDEX >> 1) & 1) | ((_SWIZZLE_INDEX >> 2) & 2) | ((_SWIZZLE_INDEX >> 3) & 4)
+
+# left (signed), glyph width, character width
+CWDH_ENTRY_DTYPE = numpy.dtype([('left', 'i1'), ('glyph', 'u1'), ('char', 'u1')])
+
+# position of the 16 pixels of an ETC1 block in (pixel_y, pixel_x) order,
+# and the bit offset of each pixel since pixels are stored column by column
+ETC_PIXEL_Y, ETC_PIXEL_X = numpy.divmod(numpy.arange(16), 4)
+ETC_PIXEL_OFFSETS = (ETC_PIXEL_X * 4 + ETC_PIXEL_Y).astype(numpy.uint16)
+# the 4 bit alpha of every pixel in the 64-bit alpha word
+ETC_ALPHA_OFFSETS = ETC_PIXEL_OFFSETS.astype(numpy.uint64) * 4
+# whether a pixel belongs to the second sub block, indexed by the orientation bit (0 = 2x4, 1 = 4x2)
+ETC_SECOND_HALF = numpy.array([ETC_PIXEL_X >= 2, ETC_PIXEL_Y >= 2])
 
 MAPPING_DIRECT = 0x00
 MAPPING_TABLE = 0x01
@@ -113,6 +162,303 @@ MAPPING_METHODS = {
 TGLP_DATA_OFFSET = 0x2000
 
 
+def _next_pow2(n: int) -> int:
+    return 1 if n <= 1 else 1 << (n - 1).bit_length()
+
+
+def _complement(input_, bits):
+    return numpy.where(input_ >> (bits - 1) == 0, input_, input_ - (1 << bits))
+
+
+def _etc1_decode(data: bytes, width: int, height: int, with_alpha: bool, order: str) -> numpy.ndarray:
+    tile_width = (width + 7) // 8
+    tile_height = (height + 7) // 8
+
+    # here's the kicker: there will always be a power-of-two amount of tiles
+    tile_width = _next_pow2(tile_width)
+    tile_height = _next_pow2(tile_height)
+
+    # texture is composed of 8x8 tiles, each made of 2x2 compressed sub-tiles (blocks) of 4x4 pixels,
+    # every block is decoded at once so the per-pixel work below runs 16 times per sheet instead of per block
+    block_count = tile_width * tile_height * 4
+    words = numpy.frombuffer(data, dtype='%su8' % order, count=block_count * (2 if with_alpha else 1))
+    words = words.reshape(block_count, -1)
+
+    pixels = words[:, -1]
+    if with_alpha:
+        alphas = words[:, 0]
+    else:
+        alphas = numpy.full(block_count, 0xFFffFFffFFffFFff, dtype=numpy.uint64)
+
+    # how colors are stored in the high-order 32 bits
+    differential = (pixels >> ETC_DIFFERENTIAL_BIT) & 0x01 == 1
+    # how the sub blocks are divided, 0 = 2x4, 1 = 4x2
+    orientation = (pixels >> ETC_ORIENTATION_BIT) & 0x01
+    # once the colors are decoded for the sub block this determines how to shift the colors
+    # which modifier row to use for sub block 1
+    table1 = (pixels >> ETC_TABLE1_OFFSET) & 0x07
+    # which modifier row to use for sub block 2
+    table2 = (pixels >> ETC_TABLE2_OFFSET) & 0x07
+
+    # colors and modifiers, even with the sign applied, fit in int16 which keeps the per-pixel arrays small
+    def channels(offsets, mask):
+        return ((pixels[:, None] >> numpy.array(offsets, dtype=numpy.uint64)) & mask).astype(numpy.int16)
+
+    # differential: grab the 5-bit code words
+    rgb = channels((ETC_DIFF_RED1_OFFSET, ETC_DIFF_GREEN1_OFFSET, ETC_DIFF_BLUE_OFFSET), 0x1F)
+    # extends from 5 to 8 bits by duplicating the 3 most significant bits
+    diff_color1 = (rgb << 3) | ((rgb >> 2) & 0x07)
+    # add the 2nd block, 3-bit code words to the original words (2's complement!)
+    rgb += _complement(channels((ETC_RED2_OFFSET, ETC_GREEN2_OFFSET, ETC_BLUE2_OFFSET), 0x07), 3)
+    # extend from 5 to 8 bits like before
+    diff_color2 = (rgb << 3) | ((rgb >> 2) & 0x07)
+
+    # individual: 4 bits per channel, 16 possible values
+    indiv_color1 = channels((ETC_INDIV_RED1_OFFSET, ETC_INDIV_GREEN1_OFFSET, ETC_INDIV_BLUE1_OFFSET), 0x0F) * 0x11
+    indiv_color2 = channels((ETC_RED2_OFFSET, ETC_GREEN2_OFFSET, ETC_BLUE2_OFFSET), 0x0F) * 0x11
+
+    color1 = numpy.where(differential[:, None], diff_color1, indiv_color1)
+    color2 = numpy.where(differential[:, None], diff_color2, indiv_color2)
+
+    # now that we have two sub block pixel colors to start from,
+    # each pixel is read as a modifier value
+
+    # 16 pixels are described with 2 bits each,
+    # one selecting the sign, the second the value
+    amounts = (pixels & 0xFFFF).astype(numpy.uint16)
+    signs = ((pixels >> 16) & 0xFFFF).astype(numpy.uint16)
+
+    # a sub block can only take 4 colors, its color with either modifier added or subtracted,
+    # so they are clipped once per block and indexed by (sub block, amount bit, sign bit)
+    modifiers = ETC_MODIFIERS[numpy.stack((table1, table2), axis=1)]
+    modifiers = numpy.stack((modifiers, -modifiers), axis=-1)
+    colors = numpy.stack((color1, color2), axis=1)
+    shifted = numpy.clip(colors[:, :, None, None] + modifiers[..., None], 0, 0xFF).astype(numpy.uint8)
+    shifted = shifted.reshape(block_count, 8, 3)
+
+    # every block is expanded to its 16 pixels in (pixel_y, pixel_x) order
+    second = ETC_SECOND_HALF[orientation]
+    # determine the amount to shift the color
+    amount = (amounts[:, None] >> ETC_PIXEL_OFFSETS) & 0x01
+    # and in which direction. 1 = -, 0 = +
+    sign = (signs[:, None] >> ETC_PIXEL_OFFSETS) & 0x01
+
+    block_pixels = numpy.empty((block_count, 16, 4), dtype=numpy.uint8)
+    block_pixels[:, :, :3] = shifted[numpy.arange(block_count)[:, None], (second * 4) + (amount * 2) + sign]
+    block_pixels[:, :, 3] = ((alphas[:, None] >> ETC_ALPHA_OFFSETS) & 0x0F) * 0x11
+
+    # blocks are stored as (tile_y, tile_x, block_y, block_x),
+    # rows are (tile_y, block_y, pixel_y), columns are (tile_x, block_x, pixel_x)
+    bmp = block_pixels.reshape(tile_height, tile_width, 2, 2, 4, 4, 4).transpose(0, 2, 4, 1, 3, 5, 6)
+    bmp = bmp.reshape(tile_height * 8, tile_width * 8, 4)
+
+    return bmp[:height, :width]
+
+
+@functools.lru_cache
+def _build_swizzle_lut(width: int, height: int) -> numpy.ndarray:
+    # maps every pixel of the sheet data (in storage order) to its position in the bitmap
+    tile_y, tile_x = numpy.ix_(range(height // 8), range(width // 8))
+    tile_origin = (tile_y * 8 * width) + (tile_x * 8)
+
+    lut = (tile_origin[:, :, None] + (SWIZZLE_Y * width) + SWIZZLE_X).ravel().astype(numpy.int32)
+    lut.flags.writeable = False
+    return lut
+
+
+def _decode_pixels(format_: Format, data: numpy.ndarray) -> numpy.ndarray:
+    pixel_size = format_.format_size()
+
+    # nibble formats store the even pixel in the low and the odd pixel in the high nibble
+    if pixel_size == 4:
+        data = ((data[:, None] >> NIBBLE_SHIFTS) & 0x0F).ravel()
+    else:
+        data = data.reshape(-1, pixel_size // 8)
+
+    pixels = numpy.zeros((len(data), 4), dtype=numpy.uint8)
+    red, green, blue, alpha = pixels.T
+
+    match format_:
+        # rrrrrrrr gggggggg bbbbbbbb aaaaaaaa
+        case Format.RGBA8:
+            pixels[:] = data
+
+        # rrrrrrrr gggggggg bbbbbbbb
+        case Format.RGB8:
+            pixels[:, :3] = data
+            alpha[:] = 255
+
+        # rrrrrggg ggbbbbba
+        case Format.RGBA5551:
+            b1, b2 = data.T
+            r5 = (b1 >> 3) & 0x1F
+            g5 = ((b1 & 0x07) << 2) | ((b2 >> 6) & 0x03)
+            b5 = (b2 >> 1) & 0x1F
+            # extend from 5 to 8 bits by duplicating the 3 most significant bits
+            red[:] = (r5 << 3) | (r5 >> 2)
+            green[:] = (g5 << 3) | (g5 >> 2)
+            blue[:] = (b5 << 3) | (b5 >> 2)
+            alpha[:] = (b2 & 0x01) * 255
+
+        # rrrrrggg gggbbbbb
+        case Format.RGB565:
+            b1, b2 = data.T
+            r5 = (b1 >> 3) & 0x1F
+            g6 = ((b1 & 0x07) << 3) | ((b2 >> 5) & 0x07)
+            b5 = b2 & 0x1F
+            # extend to 8 bits by duplicating the most significant bits
+            red[:] = (r5 << 3) | (r5 >> 2)
+            green[:] = (g6 << 2) | (g6 >> 4)
+            blue[:] = (b5 << 3) | (b5 >> 2)
+            alpha[:] = 255
+
+        # rrrrgggg bbbbaaaa
+        case Format.RGBA4:
+            b1, b2 = data.T
+            red[:] = ((b1 >> 4) & 0x0F) * 0x11
+            green[:] = (b1 & 0x0F) * 0x11
+            blue[:] = ((b2 >> 4) & 0x0F) * 0x11
+            alpha[:] = (b2 & 0x0F) * 0x11
+
+        # llllllll aaaaaaaa
+        case Format.LA8:
+            pixels[:, :3] = data[:, :1]
+            alpha[:] = data[:, 1]
+
+        # ??
+        case Format.HILO8:
+            # TODO
+            pass
+
+        # llllllll
+        case Format.L8:
+            pixels[:, :3] = data
+            alpha[:] = 255
+
+        # aaaaaaaa
+        case Format.A8:
+            pixels[:, :3] = 255
+            alpha[:] = data[:, 0]
+
+        # llllaaaa
+        case Format.LA4:
+            pixels[:, :3] = ((data >> 4) & 0x0F) * 0x11
+            alpha[:] = (data[:, 0] & 0x0F) * 0x11
+
+        # llll
+        case Format.L4:
+            pixels[:, :3] = data[:, None] * 0x11
+            alpha[:] = 255
+
+        # aaaa
+        case Format.A4:
+            pixels[:, :3] = 255
+            alpha[:] = data * 0x11
+
+    return pixels
+
+
+def _encode_pixels(format_: Format, pixels: numpy.ndarray) -> numpy.ndarray:
+    # encodes (N, 4) RGBA8 pixels into (N, bytes per pixel) uint8, 4 bit formats yield one nibble per pixel
+    red, green, blue, alpha = pixels.T.astype(numpy.int32)
+    luma = ((54 * red) + (183 * green) + (19 * blue) + 128) >> 8
+
+    match format_:
+        case Format.RGBA8:
+            channels = [red, green, blue, alpha]
+
+        case Format.RGB8:
+            channels = [red, green, blue]
+
+        # rrrrrggg ggbbbbba
+        case Format.RGBA5551:
+            r5 = (red // 8) & 0x1F
+            g5 = (green // 8) & 0x1F
+            b5 = (blue // 8) & 0x1F
+            a = (alpha > 0).astype(numpy.int32)
+
+            channels = [(r5 << 3) | (g5 >> 2), ((g5 << 6) | (b5 << 1) | a) & 0xFF]
+
+        # rrrrrggg gggbbbbb
+        case Format.RGB565:
+            r5 = (red // 8) & 0x1F
+            g6 = (green // 4) & 0x3F
+            b5 = (blue // 8) & 0x1F
+
+            channels = [(r5 << 3) | (g6 >> 3), ((g6 << 5) | b5) & 0xFF]
+
+        # rrrrgggg bbbbaaaa
+        case Format.RGBA4:
+            r4 = (red // 0x11) & 0x0F
+            g4 = (green // 0x11) & 0x0F
+            b4 = (blue // 0x11) & 0x0F
+            a4 = (alpha // 0x11) & 0x0F
+
+            channels = [(r4 << 4) | g4, (b4 << 4) | a4]
+
+        # llllllll aaaaaaaa
+        case Format.LA8:
+            channels = [luma, alpha]
+
+        # llllllll
+        case Format.L8:
+            channels = [luma]
+
+        # aaaaaaaa
+        case Format.A8:
+            channels = [alpha]
+
+        # llllaaaa
+        case Format.LA4:
+            channels = [((luma // 0x11) << 4) | ((alpha // 0x11) & 0x0F)]
+
+        # llll
+        case Format.L4:
+            channels = [luma // 0x11]
+
+        # aaaa
+        case Format.A4:
+            channels = [(alpha // 0x11) & 0x0F]
+
+        # TODO: HILO8
+        case _:
+            assert_never(format_)
+
+    return numpy.stack(channels, axis=1).astype(numpy.uint8)
+
+
+def _sort_keys(obj):
+    if isinstance(obj, dict):
+        return {key: _sort_keys(obj[key]) for key in sorted(obj)}
+    return obj
+
+
+def _escape_non_ascii(match: re.Match) -> str:
+    code = ord(match.group())
+    if code < 0x10000:
+        return '\\u%04x' % code
+    # astral characters are written as a surrogate pair, like json does
+    code -= 0x10000
+    return '\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+
+
+def _dump_json(obj, ensure_ascii: bool) -> str:
+    # orjson is a lot faster than json once indent is set (json falls back to its pure-Python encoder),
+    # the options and escaping here keep the output identical to json.dumps(indent=2, sort_keys=True)
+    if 'orjson' in globals():
+        try:
+            data = orjson.dumps(_sort_keys(obj), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates, which orjson refuses to encode
+            pass
+        else:
+            if ensure_ascii:
+                data = re.sub(r'[^\x00-\x7e]', _escape_non_ascii, data)
+            return data
+
+    return json.dumps(obj, indent=2, sort_keys=True, ensure_ascii=ensure_ascii)
+
+
 class Bffnt:
     order = None
     invalid = False
@@ -133,22 +479,24 @@ class Bffnt:
         self.load_order = load_order
 
     def read(self, filename: str):
-        data = open(filename, 'rb').read()
+        # map the file instead of reading it, slices of the memoryview don't copy
+        with open(filename, 'rb') as file_:
+            data = memoryview(mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ))
         self.file_size = len(data)
         self.filename = filename
 
-        self._parse_header(data[:FFNT_HEADER_SIZE])
+        self._parse_header(data)
         position = FFNT_HEADER_SIZE
         if self.invalid:
             return
 
-        self._parse_finf(data[position:position + FINF_HEADER_SIZE])
+        self._parse_finf(data, position)
         if self.invalid:
             return
 
         # navigate to TGLP (offset skips the MAGIC+size)
         position = self.tglp_offset - 8
-        self._parse_tglp_header(data[position:position + TGLP_HEADER_SIZE])
+        self._parse_tglp_header(data, position)
         if self.invalid:
             return
 
@@ -156,7 +504,7 @@ class Bffnt:
         cwdh = self.cwdh_offset
         while cwdh > 0:
             position = cwdh - 8
-            cwdh = self._parse_cwdh_header(data[position:position + CWDH_HEADER_SIZE])
+            cwdh = self._parse_cwdh_header(data, position)
             if cwdh is None:
                 self.invalid = True
                 return
@@ -169,7 +517,7 @@ class Bffnt:
         cmap = self.cmap_offset
         while cmap > 0:
             position = cmap - 8
-            cmap = self._parse_cmap_header(data[position:position + CMAP_HEADER_SIZE])
+            cmap = self._parse_cmap_header(data, position)
             if self.invalid:
                 return
 
@@ -217,21 +565,30 @@ class Bffnt:
         cwdh = {
             'start': 0,
             'end': 0,
-            'data': []
+            'data': None
         }
 
-        widest = 0
         glyph_indicies = list(widths.keys())
-        glyph_indicies.sort(key=self._int_sort)
+        glyph_indicies.sort(key=int)
 
         cwdh['end'] = int(glyph_indicies[-1], 10)
 
-        for idx in glyph_indicies:
-            cwdh['data'].append(widths[idx])
-            if widths[idx]['char'] > widest:
-                widest = widths[idx]['char']
+        if list(map(int, glyph_indicies)) != list(range(cwdh['end'] + 1)):
+            print('Invalid glyph widths: expected an entry for every glyph index from 0 to %d' % cwdh['end'])
+            self.invalid = True
+            return
 
-        self.tglp['maxCharWidth'] = widest
+        entries = [(widths[idx]['left'], widths[idx]['glyph'], widths[idx]['char']) for idx in glyph_indicies]
+        for idx, (left, glyph, char) in zip(glyph_indicies, entries):
+            if not (-0x80 <= left <= 0x7F and 0 <= glyph <= 0xFF and 0 <= char <= 0xFF):
+                print('Invalid glyph widths for glyph %s: left must be within -128..127, glyph and char within 0..255'
+                      % idx)
+                self.invalid = True
+                return
+
+        cwdh['data'] = numpy.array(entries, dtype=CWDH_ENTRY_DTYPE)
+
+        self.tglp['maxCharWidth'] = int(cwdh['data']['char'].max())
 
         self.cwdh_sections = [cwdh]
 
@@ -252,36 +609,38 @@ class Bffnt:
 
         self.cmap_sections = [cmap]
 
-    def _int_sort(self, n):
-        return int(n, 10)
-
-    def extract(self, ensure_ascii=True):
+    def extract(self, ensure_ascii=True, png_compression=None):
         if self.verbose:
             print('Extracting...')
         basename_ = os.path.splitext(os.path.basename(self.filename))[0]
 
         glyph_widths = {}
         for cwdh in self.cwdh_sections:
-            for index in range(cwdh['start'], cwdh['end'] + 1):
-                glyph_widths[index] = cwdh['data'][index - cwdh['start']]
+            entries = cwdh['data'][:cwdh['end'] - cwdh['start'] + 1]
+            names = entries.dtype.names
+            glyph_widths.update(zip(
+                range(cwdh['start'], cwdh['end'] + 1),
+                (dict(zip(names, entry)) for entry in entries.tolist())
+            ))
 
         glyph_mapping = {}
         for cmap in self.cmap_sections:
+            count = cmap['end'] - cmap['start'] + 1
             if cmap['type'] == MAPPING_DIRECT:
-                for code in range(cmap['start'], cmap['end'] + 1):
-                    glyph_mapping[chr(code)] = code - cmap['start'] + cmap['indexOffset']
+                codes = range(cmap['start'], cmap['end'] + 1)
+                indices = range(cmap['indexOffset'], cmap['indexOffset'] + count)
+                glyph_mapping.update(zip(map(chr, codes), indices))
             elif cmap['type'] == MAPPING_TABLE:
-                for code in range(cmap['start'], cmap['end'] + 1):
-                    index = cmap['indexTable'][code - cmap['start']]
-                    if index != 0xFFFF:
-                        glyph_mapping[chr(code)] = index
+                indices = numpy.asarray(cmap['indexTable'][:count])
+                mapped = indices != 0xFFFF
+                codes = numpy.arange(cmap['start'], cmap['start'] + len(indices))[mapped]
+                glyph_mapping.update(zip(map(chr, codes.tolist()), indices[mapped].tolist()))
             elif cmap['type'] == MAPPING_SCAN:
-                for code in cmap['entries'].keys():
-                    glyph_mapping[code] = cmap['entries'][code]
+                glyph_mapping.update(cmap['entries'])
 
         # save JSON manifest
         json_file_ = open('%s_manifest.json' % basename_, 'w', encoding="utf-8")
-        json_file_.write(json.dumps({
+        json_file_.write(_dump_json({
             'version': self.version,
             'fileType': self.filetype,
             'fontInfo': self.font_info,
@@ -298,33 +657,28 @@ class Bffnt:
             },
             'glyphWidths': glyph_widths,
             'glyphMap': glyph_mapping
-        }, indent=2, sort_keys=True, ensure_ascii=ensure_ascii))
+        }, ensure_ascii))
         json_file_.close()
 
         # save sheet bitmaps
         for i in range(self.tglp['sheetCount']):
             sheet = self.tglp['sheets'][i]
-            width = sheet['width']
-            height = sheet['height']
-            png_data = []
-            for y in range(height):
-                row = []
-                for x in range(width):
-                    for color in sheet['data'][x + (y * width)]:
-                        row.append(color)
-
-                png_data.append(row)
-
-            png.from_array(png_data, 'RGBA').save('%s_sheet%d.png' % (basename_, i))
+            writer = png.Writer(sheet['width'], sheet['height'], greyscale=False, alpha=True, bitdepth=8,
+                                compression=png_compression)
+            with open('%s_sheet%d.png' % (basename_, i), 'wb') as png_file_:
+                writer.write_array(png_file_, sheet['data'].reshape(-1))
         print('Done')
 
     def save(self, filename):
         if self.verbose:
             print('Packing...')
-        file_ = open(filename, 'wb')
+        structs = STRUCTS[self.order]
         basename_ = os.path.splitext(os.path.basename(filename))[0]
         section_count = 0
 
+        # the whole file is assembled in memory, size/offset placeholders are patched in place
+        output = bytearray()
+
         bom = 0
         if self.order == '>':
             bom = 0xFFFE
@@ -336,25 +690,21 @@ class Bffnt:
         section_count_pos = 0x10
         magic = self.filetype.upper().encode('ascii')
 
-        data = struct.pack(FFNT_HEADER_STRUCT % self.order, magic, bom, FFNT_HEADER_SIZE, self.version, 0, 0)
-        file_.write(data)
-
-        position = FFNT_HEADER_SIZE
+        output += structs['ffnt'].pack(magic, bom, FFNT_HEADER_SIZE, self.version, 0, 0)
 
         # write finf
         if self.verbose:
             print('Writing FINF...')
         font_info = self.font_info
         default_width = font_info['defaultWidth']
-        finf_tglp_offset_pos = position + 0x14
-        finf_cwdh_offset_pos = position + 0x18
-        finf_cmap_offset_pos = position + 0x1C
-        data = struct.pack(FINF_HEADER_STRUCT % self.order, FINF_HEADER_MAGIC, FINF_HEADER_SIZE, font_info['fontType'],
-                           font_info['height'], font_info['width'], font_info['ascent'], font_info['lineFeed'],
-                           font_info['alterCharIdx'], default_width['left'], default_width['glyphWidth'],
-                           default_width['charWidth'], font_info['encoding'], 0, 0, 0)
-        file_.write(data)
-        position += FINF_HEADER_SIZE
+        finf_tglp_offset_pos = len(output) + 0x14
+        finf_cwdh_offset_pos = len(output) + 0x18
+        finf_cmap_offset_pos = len(output) + 0x1C
+        output += structs['finf'].pack(FINF_HEADER_MAGIC, FINF_HEADER_SIZE, font_info['fontType'],
+                                       font_info['height'], font_info['width'], font_info['ascent'],
+                                       font_info['lineFeed'], font_info['alterCharIdx'], default_width['left'],
+                                       default_width['glyphWidth'], default_width['charWidth'], font_info['encoding'],
+                                       0, 0, 0)
 
         section_count += 1
 
@@ -363,22 +713,19 @@ class Bffnt:
             print('Writing TGLP...')
         tglp = self.tglp
         sheet = tglp['sheet']
-        tglp_size_pos = position + 0x04
-        tglp_data_size = int(sheet['width'] * sheet['height'] * (sheet['format'].format_size() / 8.0))
+        tglp_size_pos = len(output) + 0x04
+        tglp_data_size = sheet['width'] * sheet['height'] * sheet['format'].format_size() // 8
 
-        file_.seek(finf_tglp_offset_pos)
-        file_.write(struct.pack('%sI' % self.order, position + 8))
-        file_.seek(position)
+        structs['u32'].pack_into(output, finf_tglp_offset_pos, len(output) + 8)
 
-        tglp_start_pos = position
-        data = struct.pack(TGLP_HEADER_STRUCT % self.order, TGLP_HEADER_MAGIC, 0, tglp['glyph']['width'],
+        tglp_start_pos = len(output)
+        output += structs['tglp'].pack(TGLP_HEADER_MAGIC, 0, tglp['glyph']['width'],
                        tglp['glyph']['height'], tglp['sheetCount'], tglp['maxCharWidth'], tglp_data_size,
                        tglp['glyph']['baseline'], sheet['format'].value, sheet['cols'], sheet['rows'], sheet['width'],
                        sheet['height'], TGLP_DATA_OFFSET)
-        file_.write(data)
 
-        file_.seek(TGLP_DATA_OFFSET)
-        position = TGLP_DATA_OFFSET
+        # sheet data starts at a fixed offset, zero-filled up to there
+        output += bytes(TGLP_DATA_OFFSET - len(output))
 
         section_count += 1
 
@@ -387,7 +734,8 @@ class Bffnt:
             sheet_file_ = open(sheet_filename, 'rb')
 
             reader = png.Reader(file=sheet_file_)
-            width, height, pixels, metadata = reader.read()
+            # rows are converted to RGBA8 and decoded lazily while they are copied into the bitmap
+            width, height, pixels, metadata = reader.asRGBA8()
 
             if width != sheet['width'] or height != sheet['height']:
                 print('Invalid sheet PNG:\nexpected an image size of %dx%d but %s is %dx%d' %
@@ -395,35 +743,19 @@ class Bffnt:
                 self.invalid = True
                 return
 
-            if metadata['bitdepth'] != 8 or metadata['alpha'] != True:
-                print('Invalid sheet PNG:\nexpected a PNG8 with alpha')
-
             self.tglp['sheet']['size'] = tglp_data_size
 
-            bmp: List[Tuple[int, int, int, int]] = []
-            for row in list(pixels):
-                for pixel in range(0, len(row), 4):
-                    bmp.append((
-                        row[pixel],
-                        row[pixel + 1],
-                        row[pixel + 2],
-                        row[pixel + 3],
-                    ))
+            bmp = numpy.empty((height, width * 4), dtype=numpy.uint8)
+            for y, row in enumerate(pixels):
+                bmp[y] = row
+            bmp = bmp.reshape(height, width, 4)
 
-            data = self._bitmap_to_sheet(bmp)
-
-            data = struct.pack('%dB' % len(data), *data)
-            file_.write(data)
-            position += len(data)
+            output += self._bitmap_to_sheet(bmp)
 
             sheet_file_.close()
 
-        file_.seek(tglp_size_pos)
-        file_.write(struct.pack('%sI' % self.order, position - tglp_start_pos))
-
-        file_.seek(finf_cwdh_offset_pos)
-        file_.write(struct.pack('%sI' % self.order, position + 8))
-        file_.seek(position)
+        structs['u32'].pack_into(output, tglp_size_pos, len(output) - tglp_start_pos)
+        structs['u32'].pack_into(output, finf_cwdh_offset_pos, len(output) + 8)
 
         # write cwdh
         if self.verbose:
@@ -432,31 +764,19 @@ class Bffnt:
         for cwdh in self.cwdh_sections:
             section_count += 1
             if prev_cwdh_offset_pos > 0:
-                file_.seek(prev_cwdh_offset_pos)
-                file_.write(struct.pack('%sI' % self.order, position + 8))
-                file_.seek(position)
+                structs['u32'].pack_into(output, prev_cwdh_offset_pos, len(output) + 8)
 
-            size_pos = position + 0x04
-            prev_cwdh_offset_pos = position + 0x0C
+            size_pos = len(output) + 0x04
+            prev_cwdh_offset_pos = len(output) + 0x0C
 
-            start_pos = position
-            data = struct.pack(CWDH_HEADER_STRUCT % self.order, CWDH_HEADER_MAGIC, 0, cwdh['start'], cwdh['end'], 0)
-            file_.write(data)
-            position += CWDH_HEADER_SIZE
+            start_pos = len(output)
+            output += structs['cwdh'].pack(CWDH_HEADER_MAGIC, 0, cwdh['start'], cwdh['end'], 0)
 
-            for code in range(cwdh['start'], cwdh['end'] + 1):
-                widths = cwdh['data'][code]
-                for key in ('left', 'glyph', 'char'):
-                    file_.write(struct.pack('=b', widths[key]))
-                    position += 1
+            output += cwdh['data'][:cwdh['end'] - cwdh['start'] + 1].tobytes()
 
-            file_.seek(size_pos)
-            file_.write(struct.pack('%sI' % self.order, position - start_pos))
-            file_.seek(position)
+            structs['u32'].pack_into(output, size_pos, len(output) - start_pos)
 
-        file_.seek(finf_cmap_offset_pos)
-        file_.write(struct.pack('%sI' % self.order, position + 8))
-        file_.seek(position)
+        structs['u32'].pack_into(output, finf_cmap_offset_pos, len(output) + 8)
 
         # write cmap
         if self.verbose:
@@ -465,47 +785,34 @@ class Bffnt:
         for cmap in self.cmap_sections:
             section_count += 1
             if prev_cmap_offset_pos > 0:
-                file_.seek(prev_cmap_offset_pos)
-                file_.write(struct.pack('%sI' % self.order, position + 8))
-                file_.seek(position)
+                structs['u32'].pack_into(output, prev_cmap_offset_pos, len(output) + 8)
 
-            size_pos = position + 0x04
-            prev_cmap_offset_pos = position + 0x10
+            size_pos = len(output) + 0x04
+            prev_cmap_offset_pos = len(output) + 0x10
 
-            start_pos = position
-            data = struct.pack(CMAP_HEADER_STRUCT % self.order, CMAP_HEADER_MAGIC, 0, cmap['start'], cmap['end'],
-                               cmap['type'], 0, 0)
-            file_.write(data)
-            position += CMAP_HEADER_SIZE
+            start_pos = len(output)
+            output += structs['cmap'].pack(CMAP_HEADER_MAGIC, 0, cmap['start'], cmap['end'], cmap['type'], 0, 0)
 
-            file_.write(struct.pack('%sH' % self.order, len(cmap['entries'])))
-            position += 2
+            output += structs['u16'].pack(len(cmap['entries']))
 
             if cmap['type'] == MAPPING_DIRECT:
-                file_.write(struct.pack('%sH' % self.order, cmap['indexOffset']))
-                position += 2
+                output += structs['u16'].pack(cmap['indexOffset'])
             elif cmap['type'] == MAPPING_TABLE:
-                for index in cmap['indexTable']:
-                    file_.write(struct.pack('%sH' % self.order, index))
-                    position += 2
+                index_table = cmap['indexTable']
+                output += struct.pack('%s%dH' % (self.order, len(index_table)), *index_table)
             elif cmap['type'] == MAPPING_SCAN:
-                keys = list(cmap['entries'].keys())
-                keys.sort()
-                for code in keys:
-                    index = cmap['entries'][code]
-                    file_.write(struct.pack('%s2H' % self.order, ord(code), index))
-                    position += 4
+                entries = sorted(cmap['entries'].items())
+                output += struct.pack('%s%dH' % (self.order, len(entries) * 2),
+                                      *itertools.chain.from_iterable((ord(code), index) for code, index in entries))
 
-            file_.seek(size_pos)
-            file_.write(struct.pack('%sI' % self.order, position - start_pos))
-            file_.seek(position)
+            structs['u32'].pack_into(output, size_pos, len(output) - start_pos)
 
         # fill in size/offset placeholders
-        file_.seek(file_size_pos)
-        file_.write(struct.pack('%sI' % self.order, position))
+        structs['u32'].pack_into(output, file_size_pos, len(output))
+        structs['u32'].pack_into(output, section_count_pos, section_count)
 
-        file_.seek(section_count_pos)
-        file_.write(struct.pack('%sI' % self.order, section_count))
+        with open(filename, 'wb') as file_:
+            file_.write(output)
         if self.verbose:
             print('Done!')
 
@@ -521,7 +828,7 @@ class Bffnt:
             self.invalid = True
             return
 
-        magic, bom, header_size, self.version, file_size, sections = struct.unpack(FFNT_HEADER_STRUCT % self.order, data)
+        magic, bom, header_size, self.version, file_size, sections = STRUCTS[self.order]['ffnt'].unpack_from(data)
 
         if magic not in FFNT_HEADER_MAGIC:
             print('Invalid FFNT magic bytes: %s (expected %s)' % (magic, FFNT_HEADER_MAGIC))
@@ -556,10 +863,10 @@ class Bffnt:
             print('FFNT File Size: %d' % file_size)
             print('FFNT Sections: %d\n' % sections)
 
-    def _parse_finf(self, data):
+    def _parse_finf(self, data, position):
         magic, section_size, font_type, height, width, ascent, line_feed, alter_char_idx, def_left, def_glyph_width, \
                 def_char_width, encoding, tglp_offset, cwdh_offset, cmap_offset \
-                = struct.unpack(FINF_HEADER_STRUCT % self.order, data)
+                = STRUCTS[self.order]['finf'].unpack_from(data, position)
 
         if magic != FINF_HEADER_MAGIC:
             print('Invalid FINF magic bytes: %s (expected %s)' % (magic, FINF_HEADER_MAGIC))
@@ -607,10 +914,10 @@ class Bffnt:
             print('FINF CWDH Offset: 0x%08x' % cwdh_offset)
             print('FINF CMAP Offset: 0x%08x\n' % cmap_offset)
 
-    def _parse_tglp_header(self, data):
+    def _parse_tglp_header(self, data, position):
         magic, section_size, cell_width, cell_height, num_sheets, max_char_width, sheet_size, baseline_position, \
                 sheet_pixel_format, num_sheet_cols, num_sheet_rows, sheet_width, sheet_height, sheet_data_offset \
-                = struct.unpack(TGLP_HEADER_STRUCT % self.order, data)
+                = STRUCTS[self.order]['tglp'].unpack_from(data, position)
 
         if magic != TGLP_HEADER_MAGIC:
             print('Invalid TGLP magic bytes: %s (expected %s)' % (magic, TGLP_HEADER_MAGIC))
@@ -653,6 +960,7 @@ class Bffnt:
             print('TGLP Sheet Data Offset: 0x%08x\n' % sheet_data_offset)
 
     def _parse_tglp_data(self, data):
+        # every sheet is stored as an (height, width, 4) RGBA8 array
         position = self.tglp['sheetOffset']
         self.tglp['sheets'] = []
         format_: Format = self.tglp['sheet']['format']
@@ -675,404 +983,62 @@ class Bffnt:
 
         with_alpha = self.tglp['sheet']['format'] == Format.ETC1A4
 
-        block_size = 16 if with_alpha else 8
-
-        bmp = [[0, 0, 0, 0]] * width * height
-
-        tile_width = int(math.ceil(width / 8.0))
-        tile_height = int(math.ceil(height / 8.0))
-
-        # here's the kicker: there will always be a power-of-two amount of tiles
-        tile_width = 1 << int(math.ceil(math.log(tile_width, 2)))
-        tile_height = 1 << int(math.ceil(math.log(tile_height, 2)))
-
-        pos = 0
-
-        # texture is composed of 8x8 tiles
-        for tile_y in range(tile_height):
-            for tile_x in range(tile_width):
-
-                # in ETC1 mode each tile is composed of 2x2, compressed sub-tiles, 4x4 pixels each
-                for block_y in range(2):
-                    for block_x in range(2):
-                        data_pos = pos
-                        pos += block_size
-
-                        block = data[data_pos:data_pos + block_size]
-
-                        alphas = 0xFFffFFffFFffFFff
-                        if with_alpha:
-                            alphas = struct.unpack('%sQ' % self.order, block[:8])[0]
-                            block = block[8:]
+        return _etc1_decode(data, width, height, with_alpha, self.order)
 
-                        pixels = struct.unpack('%sQ' % self.order, block)[0]
-
-                        # how colors are stored in the high-order 32 bits
-                        differential = (pixels >> ETC_DIFFERENTIAL_BIT) & 0x01 == 1
-                        # how the sub blocks are divided, 0 = 2x4, 1 = 4x2
-                        horizontal = (pixels >> ETC_ORIENTATION_BIT) & 0x01 == 1
-                        # once the colors are decoded for the sub block this determines how to shift the colors
-                        # which modifier row to use for sub block 1
-                        table1 = ETC_MODIFIERS[(pixels >> ETC_TABLE1_OFFSET) & 0x07]
-                        # which modifier row to use for sub block 2
-                        table2 = ETC_MODIFIERS[(pixels >> ETC_TABLE2_OFFSET) & 0x07]
-
-                        color1 = [0, 0, 0]
-                        color2 = [0, 0, 0]
-
-                        if differential:
-                            # grab the 5-bit code words
-                            r = ((pixels >> ETC_DIFF_RED1_OFFSET) & 0x1F)
-                            g = ((pixels >> ETC_DIFF_GREEN1_OFFSET) & 0x1F)
-                            b = ((pixels >> ETC_DIFF_BLUE_OFFSET) & 0x1F)
-
-                            # extends from 5 to 8 bits by duplicating the 3 most significant bits
-                            color1[0] = (r << 3) | ((r >> 2) & 0x07)
-                            color1[1] = (g << 3) | ((g >> 2) & 0x07)
-                            color1[2] = (b << 3) | ((b >> 2) & 0x07)
-
-                            # add the 2nd block, 3-bit code words to the original words (2's complement!)
-                            r += self._complement((pixels >> ETC_RED2_OFFSET) & 0x07, 3)
-                            g += self._complement((pixels >> ETC_GREEN2_OFFSET) & 0x07, 3)
-                            b += self._complement((pixels >> ETC_BLUE2_OFFSET) & 0x07, 3)
-
-                            # extend from 5 to 8 bits like before
-                            color2[0] = (r << 3) | ((r >> 2) & 0x07)
-                            color2[1] = (g << 3) | ((g >> 2) & 0x07)
-                            color2[2] = (b << 3) | ((b >> 2) & 0x07)
-                        else:
-                            # 4 bits per channel, 16 possible values
-
-                            # 1st block
-                            color1[0] = ((pixels >> ETC_INDIV_RED1_OFFSET) & 0x0F) * 0x11
-                            color1[1] = ((pixels >> ETC_INDIV_GREEN1_OFFSET) & 0x0F) * 0x11
-                            color1[2] = ((pixels >> ETC_INDIV_BLUE1_OFFSET) & 0x0F) * 0x11
-
-                            # 2nd block
-                            color2[0] = ((pixels >> ETC_RED2_OFFSET) & 0x0F) * 0x11
-                            color2[1] = ((pixels >> ETC_GREEN2_OFFSET) & 0x0F) * 0x11
-                            color2[2] = ((pixels >> ETC_BLUE2_OFFSET) & 0x0F) * 0x11
-
-                        # now that we have two sub block pixel colors to start from,
-                        # each pixel is read as a modifier value
-
-                        # 16 pixels are described with 2 bits each,
-                        # one selecting the sign, the second the value
-
-                        amounts = pixels & 0xFFFF
-                        signs = (pixels >> 16) & 0xFFFF
-
-                        for pixel_y in range(4):
-                            for pixel_x in range(4):
-                                x = pixel_x + (block_x * 4) + (tile_x * 8)
-                                y = pixel_y + (block_y * 4) + (tile_y * 8)
-
-                                if x >= width:
-                                    continue
-                                if y >= height:
-                                    continue
-
-                                offset = pixel_x * 4 + pixel_y
-
-                                if horizontal:
-                                    table = table1 if pixel_y < 2 else table2
-                                    color = color1 if pixel_y < 2 else color2
-                                else:
-                                    table = table1 if pixel_x < 2 else table2
-                                    color = color1 if pixel_x < 2 else color2
-
-                                # determine the amount to shift the color
-                                amount = table[(amounts >> offset) & 0x01]
-                                # and in which direction. 1 = -, 0 = +
-                                sign = (signs >> offset) & 0x01
-
-                                if sign == 1:
-                                    amount *= -1
-
-                                red = max(min(color[0] + amount, 0xFF), 0)
-                                green = max(min(color[1] + amount, 0xFF), 0)
-                                blue = max(min(color[2] + amount, 0xFF), 0)
-                                alpha = ((alphas >> (offset * 4)) & 0x0F) * 0x11
-
-                                pixel_pos = y * width + x
-
-                                bmp[pixel_pos] = [red, green, blue, alpha]
-        return bmp
-
-    def _complement(self, input_, bits):
-        if input_ >> (bits - 1) == 0:
-            return input_
-        return input_ - (1 << bits)
-
-    def visit_pixels(
-        self,
-        vistor: Callable[[
-            Format, # format
-            List[Tuple[int, int, int, int]], int, # bmp + pos
-            bytes, int, # data + pos
-        ], None],
-        width: int,
-        height: int,
-        format_: Format,
-        bmp: List[Tuple[int, int, int, int]],
-        sheet_data: bytes,
-    ):
-        tile_width = width // 8
-        tile_height = height // 8
-
-        # sheet is composed of 8x8 pixel tiles
-        for tile_y in range(tile_height):
-            for tile_x in range(tile_width):
-
-                # tile is composed of 2x2 sub-tiles
-                for y in range(2):
-                    for x in range(2):
-
-                        # sub-tile is composed of 2x2 pixel groups
-                        for y2 in range(2):
-                            for x2 in range(2):
-
-                                # pixel group is composed of 2x2 pixels (finally)
-                                for y3 in range(2):
-                                    for x3 in range(2):
-                                        pixel_x = (x3 + (x2 * 2) + (x * 4) + (tile_x * 8))
-                                        pixel_y = (y3 + (y2 * 2) + (y * 4) + (tile_y * 8))
-
-                                        data_x = (x3 + (x2 * 4) + (x * 16) + (tile_x * 64))
-                                        data_y = ((y3 * 2) + (y2 * 8) + (y * 32) + (tile_y * width * 8))
-
-                                        sheet_data_pos = data_x + data_y
-                                        bmp_pos = pixel_x + (pixel_y * width)
-
-                                        if bmp_pos >= len(bmp):
-                                            continue
-                                        if (sheet_data_pos * format_.format_size() // 8) >= len(sheet_data):
-                                            continue
-
-                                        vistor(format_, bmp, bmp_pos, sheet_data, sheet_data_pos)
-
-    def _sheet_to_bitmap(self, sheet_data):
-        width = self.tglp['sheet']['width']
-        height = self.tglp['sheet']['height']
+    def _sheet_to_bitmap(self, sheet_data) -> numpy.ndarray:
+        sheet_width = width = self.tglp['sheet']['width']
+        sheet_height = height = self.tglp['sheet']['height']
         format_: Format = self.tglp['sheet']['format']
+        pixel_size = format_.format_size()
 
         # increase the size of the image to a power-of-two boundary, if necessary
-        width = 1 << int(math.ceil(math.log(width, 2)))
-        height = 1 << int(math.ceil(math.log(height, 2)))
+        width = _next_pow2(width)
+        height = _next_pow2(height)
 
         # initialize empty bitmap memory (RGBA8)
-        bmp: List[Tuple[int, int, int, int]] = [(0, 0, 0, 0)] * (width * height)
-
-        def vistor(
-            format: Format,
-            bmp: List[Tuple[int, int, int, int]], bmp_pos: int,
-            sheet_data: bytes, sheet_data_pos: int
-        ):
-            bmp[bmp_pos] = self._get_pixel_data(format, sheet_data, sheet_data_pos)
-
-        self.visit_pixels(vistor, width, height, format_, bmp, sheet_data)
-
-        return bmp
-
-    def _get_pixel_data(self, format_, data: bytes, index: int) -> Tuple[int, int, int, int]:
-        red = green = blue = alpha = 0
-
-        # rrrrrrrr gggggggg bbbbbbbb aaaaaaaa
-        if format_ == Format.RGBA8:
-            red, green, blue, alpha = struct.unpack('4B', data[index * 4:index * 4 + 4])
+        bmp = numpy.zeros((width * height, 4), dtype=numpy.uint8)
 
-        # rrrrrrrr gggggggg bbbbbbbb
-        elif format_ == Format.RGB8:
-            red, green, blue = struct.unpack('3B', data[index * 3:index * 3 + 3])
-            alpha = 255
-
-        # rrrrrgg gggbbbbba
-        elif format_ == Format.RGBA5551:
-            b1, b2 = struct.unpack('2B', data[index * 2:index * 2 + 2])
-
-            red = ((b1 >> 3) & 0x1F)
-            green = (b1 & 0x07) | ((b2 >> 6) & 0x03)
-            blue = (b2 >> 1) & 0x1F
-            alpha = (b2 & 0x01) * 255
-
-        # rrrrrggg gggbbbbb
-        elif format_ == Format.RGB565:
-            b1, b2 = struct.unpack('2B', data[index * 2:index * 2 + 2])
-
-            red = (b1 >> 3) & 0x1F
-            green = (b1 & 0x7) | ((b2 >> 5) & 0x7)
-            blue = (b2 & 0x1F)
-            alpha = 255
-
-        # rrrrgggg bbbbaaaa
-        elif format_ == Format.RGBA4:
-            b1, b2 = struct.unpack('2B', data[index * 2:index * 2 + 2])
-
-            red = ((b1 >> 4) & 0x0F) * 0x11
-            alpha = (b1 & 0x0F) * 0x11
-            blue = ((b2 >> 4) & 0x0F) * 0x11
-            green = (b2 & 0x0F) * 0x11
+        # decode all pixels the sheet data holds at once, then move them into place
+        lut = _build_swizzle_lut(width, height)
+        count = min(len(lut), len(sheet_data) * 8 // pixel_size)
+        data = numpy.frombuffer(sheet_data, dtype=numpy.uint8, count=(count * pixel_size + 7) // 8)
+        bmp[lut[:count]] = _decode_pixels(format_, data)[:count]
 
-        # llllllll aaaaaaaa
-        elif format_ == Format.LA8:
-            l, alpha = struct.unpack('2B', data[index * 2:index * 2 + 2])
-            red = green = blue = l
-
-        # ??
-        elif format_ == Format.HILO8:
-            # TODO
-            pass
-
-        # llllllll
-        elif format_ == Format.L8:
-            red = green = blue = struct.unpack('B', data[index:index + 1])[0]
-            alpha = 255
-
-        # aaaaaaaa
-        elif format_ == Format.A8:
-            alpha, = struct.unpack('B', data[index:index + 1])
-            red = green = blue = 255
+        return bmp.reshape(height, width, 4)[:sheet_height, :sheet_width]
 
-        # llllaaaa
-        elif format_ == Format.LA4:
-            la, = struct.unpack('B', data[index:index + 1])
-            red = green = blue = ((la >> 4) & 0x0F) * 0x11
-            alpha = (la & 0x0F) * 0x11
-
-        # llll
-        elif format_ == Format.L4:
-            l = data[index // 2]
-            if index & 1 == 1:
-                l >>= 4
-            l &= 0x0F
-
-            red = green = blue = l * 0x11
-            alpha = 255
-
-        # aaaa
-        elif format_ == Format.A4:
-            a = data[index // 2]
-            if index & 1 == 1:
-                a >>= 4
-            a &= 0x0F
-
-            alpha = a * 0x11
-            green = red = blue = 0xFF
-
-        return red, green, blue, alpha
-
-    def _bitmap_to_sheet(self, bmp: List[Tuple[int, int, int, int]]) -> bytes:
+    def _bitmap_to_sheet(self, bmp: numpy.ndarray) -> bytearray:
         width = self.tglp['sheet']['width']
         height = self.tglp['sheet']['height']
         format_: Format = self.tglp['sheet']['format']
 
         # increase the size of the image to a power-of-two boundary, if necessary
-        width = 1 << int(math.ceil(math.log(width, 2)))
-        height = 1 << int(math.ceil(math.log(height, 2)))
-
-        sheet_data: bytes = [0] * self.tglp['sheet']['size']
-
-        def vistor(_, bmp, bmp_pos, sheet_data, sheet_data_pos):
-            # OR the data since there are pixel formats which use the same byte for
-            # multiple pixels (A4/L4)
-            bytes_ = self._get_tglp_pixel_data(bmp, bmp_pos, format_)
-            if len(bytes_) > 1:
-                sheet_data[sheet_data_pos:sheet_data_pos + len(bytes_)] = bytes_
-            else:
-                if format_.format_size() == 4:
-                    sheet_data_pos //= 2
-                sheet_data[sheet_data_pos] |= bytes_[0]
-
-        self.visit_pixels(vistor, width, height, format_, bmp, sheet_data)
-
+        width = _next_pow2(width)
+        height = _next_pow2(height)
+
+        sheet_data = bytearray(self.tglp['sheet']['size'])
+        pixel_size = format_.format_size()
+
+        # gather the bitmap pixels in the order they are stored in the sheet data, pixels outside
+        # of the bitmap stay transparent black which every format encodes as zero
+        lut = _build_swizzle_lut(width, height)
+        count = min(len(lut), len(sheet_data) * 8 // pixel_size)
+        pixels = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+        pixels[:bmp.shape[0], :bmp.shape[1]] = bmp[:height, :width]
+        pixels = pixels.reshape(-1, 4)[lut[:count]]
+
+        encoded = _encode_pixels(format_, pixels)
+        if pixel_size == 4:
+            # A4/L4 share a byte between two pixels, the even pixel goes in the low nibble
+            encoded = numpy.bitwise_or.reduce(encoded.reshape(-1, 2) << NIBBLE_SHIFTS, axis=1)
+
+        encoded = encoded.ravel()
+        # write through a view so the bytearray is filled in place
+        numpy.frombuffer(sheet_data, dtype=numpy.uint8, count=len(encoded))[:] = encoded
         return sheet_data
 
-    def _get_tglp_pixel_data(self, bmp: List[Tuple[int, int, int, int]], index: int, format_) -> List[int]:
-        red, green, blue, alpha = bmp[index]
-
-        match format_:
-            case Format.RGBA8:
-                return [red, green, blue, alpha]
-
-            case Format.RGB8:
-                return [red, green, blue]
-
-            # rrrrrggg ggbbbbba
-            case Format.RGBA5551:
-                r5 = (red // 8) & 0x1F
-                g5 = (green // 8) & 0x1F
-                b5 = (blue // 8) & 0x1F
-                a = 1 if alpha > 0 else 0
-
-                b1 = (r5 << 3) | (g5 >> 2)
-                b2 = ((g5 << 6) | (b5 << 1) | a) & 0xFF
-                return [b1, b2]
-
-            # rrrrrggg gggbbbbb
-            case Format.RGB565:
-                r5 = (red // 8) & 0x1F
-                g6 = (green // 4) & 0x3F
-                b5 = (blue // 8) & 0x1F
-
-                b1 = (r5 << 3) | (g6 >> 3)
-                b2 = ((g6 << 5) | b5) & 0xFF
-                return [b1, b2]
-
-            # rrrrgggg bbbbaaaa
-            case Format.RGBA4:
-                r4 = (red // 0x11) & 0x0F
-                g4 = (green // 0x11) & 0x0F
-                b4 = (blue // 0x11) & 0x0F
-                a4 = (alpha // 0x11) & 0x0F
-
-                b1 = (r4 << 4) | g4
-                b2 = (b4 << 4) | a4
-                return [b1, b2]
-
-            # llllllll aaaaaaaa
-            case Format.LA8:
-                l = int((red * 0.2126) + (green * 0.7152) + (blue * 0.0722))
-                return [l, alpha]
-
-            # TODO
-            case Format.HILO8:
-                assert_never(format_)
-
-            # llllllll
-            case Format.L8:
-                l = int((red * 0.2126) + (green * 0.7152) + (blue * 0.0722))
-                return [l]
-
-            # aaaaaaaa
-            case Format.A8:
-                return [alpha]
-
-            # llllaaaa
-            case Format.LA4:
-                l = int((red * 0.2126) + (green * 0.7152) + (blue * 0.0722)) // 0x11
-                a = (alpha // 0x11) & 0x0F
-
-                b = (l << 4) | a
-                return [b]
-
-            # llll
-            case Format.L4:
-                l = int((red * 0.2126) + (green * 0.7152) + (blue * 0.0722))
-                shift = (index & 1) * 4
-                return [l << shift]
-
-            # aaaa
-            case Format.A4:
-                alpha = (alpha // 0x11) & 0xF
-                shift = (index & 1) * 4
-                return [alpha << shift]
-
-            case _:
-                assert_never(format_)
-
-    def _parse_cwdh_header(self, data) -> Optional[int]:
+    def _parse_cwdh_header(self, data, position) -> Optional[int]:
         magic, section_size, start_index, end_index, next_cwdh_offset \
-            = struct.unpack(CWDH_HEADER_STRUCT % self.order, data)
+            = STRUCTS[self.order]['cwdh'].unpack_from(data, position)
 
         if magic != CWDH_HEADER_MAGIC:
             print('Invalid CWDH magic bytes: %s (expected %s)' % (magic, CWDH_HEADER_MAGIC))
@@ -1096,21 +1062,11 @@ class Bffnt:
 
     def _parse_cwdh_data(self, info, data):
         count = info['end'] - info['start'] + 1
-        output = []
-        position = 0
-        for _ in range(count):
-            left, glyph, char = struct.unpack('%sb2B' % self.order, data[position:position + 3])
-            position += 3
-            output.append({
-                'left': left,
-                'glyph': glyph,
-                'char': char
-            })
-        info['data'] = output
+        info['data'] = numpy.frombuffer(data, dtype=CWDH_ENTRY_DTYPE, count=count)
 
-    def _parse_cmap_header(self, data):
+    def _parse_cmap_header(self, data, position):
         magic, section_size, code_begin, code_end, map_method, unknown, next_cmap_offset \
-            = struct.unpack(CMAP_HEADER_STRUCT % self.order, data)
+            = STRUCTS[self.order]['cmap'].unpack_from(data, position)
 
         if magic != CMAP_HEADER_MAGIC:
             print('Invalid CMAP magic bytes: %s (expected %s)' % (magic, CMAP_HEADER_MAGIC))
@@ -1139,28 +1095,16 @@ class Bffnt:
             print('\nParsing CMAP...')
         type_ = info['type']
         if type_ == MAPPING_DIRECT:
-            info['indexOffset'] = struct.unpack('%sH' % self.order, data[:2])[0]
+            info['indexOffset'] = STRUCTS[self.order]['u16'].unpack_from(data)[0]
 
         elif type_ == MAPPING_TABLE:
             count = info['end'] - info['start'] + 1
-            position = 0
-            output = []
-            for _ in range(count):
-                offset = struct.unpack('%sH' % self.order, data[position:position + 2])[0]
-                position += 2
-                output.append(offset)
-            info['indexTable'] = output
+            info['indexTable'] = list(struct.unpack_from('%s%dH' % (self.order, count), data))
 
         elif type_ == MAPPING_SCAN:
-            position = 0
-            count = struct.unpack('%sH' % self.order, data[position:position + 2])[0]
-            position += 2
-            output = {}
-            for _ in range(count):
-                code, offset = struct.unpack('%s2H' % self.order, data[position:position + 4])
-                position += 4
-                output[chr(code)] = offset
-            info['entries'] = output
+            count = STRUCTS[self.order]['u16'].unpack_from(data)[0]
+            pairs = struct.unpack_from('%s%dH' % (self.order, count * 2), data, 2)
+            info['entries'] = dict(zip(map(chr, pairs[0::2]), pairs[1::2]))
 
 
 def prompt_yes_no(prompt):
@@ -1189,6 +1133,7 @@ def main(
     debug:         bool = Opt(False, '-d', '--debug',         help='print debug information'),
     yes:           bool = Opt(False, '-y', '--yes',           help='answer yes to any questions (overwriting files)'),
     ensure_ascii:  bool = Opt(True,  '-a', '--ensure-ascii',  help='turn off ensure_ascii option when dump json file'),
+    fast_png:      bool = Opt(False, '-z', '--fast-png',      help='use fast, light compression for extracted sheet PNGs'),
     # these two are exclusive
     little_endian: bool = Opt(False, '-l', '--little-endian', help='Use little endian encoding in the created BFFNT file\n[default]'),
     big_endian:    bool = Opt(False, '-b', '--big-endian',    help='Use big endian encoding in the created BFFNT file'),
@@ -1256,7 +1201,7 @@ def main(
         bffnt.read(file)
         if bffnt.invalid:
             exit(1)
-        bffnt.extract(ensure_ascii)
+        bffnt.extract(ensure_ascii, png_compression=1 if fast_png else None)
     elif create:
         bffnt.load(json_file)
         if bffnt.invalid: